@@ -24,7 +24,7 @@ class ConvergenceChecker():
     def check(self, x, xbar=None, verbose=False):
         if self.vartol is not None:
             if xbar is None:
-                xbar = sum(x)/len(x)
+                xbar = np.mean(x, axis=0)
             deviation = x - xbar
             if np.linalg.norm(deviation) < self.vartol:
                 self.varcounter -= 1
@@ -34,7 +34,7 @@ class ConvergenceChecker():
                 self.varcounter = self.count
         if self.checkobj:
             if xbar is None:
-                xbar = sum(x)/len(x)
+                xbar = np.mean(x, axis=0)
             f = self.objective(xbar) #self.data, 
             if verbose:
                 print("Objective value on mean", f)
@@ -47,8 +47,8 @@ class ConvergenceChecker():
                 self.last = f
         if self.earlyterm is not None:
             if xbar is None:
-                xbar = sum(x)/len(x)
-            xdev = sum(abs(x[i] - xbar) for i in range(len(x)))
+                xbar = np.mean(x, axis=0)
+            xdev = np.abs(np.asarray(x) - xbar).sum(axis=0)
             changed = np.sum(xdev != 0)
             if verbose:print("Vars with disagreement", changed)
             if changed < self.earlyterm:
@@ -69,7 +69,9 @@ class ConvergenceChecker():
 # Splitting Algorithm Execution Functions
 def getWarmPrimal(x, L):
     n = L.shape[0]
-    P = (np.eye(n)-L)@np.ones(n)
+    # (I - L) 1 without forming I - L, so L may also be sparse
+    ones = np.ones(n)
+    P = ones - L@ones
     return [i*x for i in P]
 
 def getWarmDual(d):
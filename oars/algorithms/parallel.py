@@ -1,17 +1,23 @@
 import numpy as np
 import multiprocessing as mp
+import os
+import sys
+from multiprocessing.shared_memory import SharedMemory
+from scipy.sparse import tril, csr_array
+from queue import SimpleQueue
+from threading import Thread
 from oars.algorithms.helpers import ConvergenceChecker, getWarmPrimal
 from time import time
 
-def parallelAlgorithm(n, data, resolvents, W, Z, warmstartprimal=None, warmstartdual=None, itrs=1001, gamma=0.9, alpha=1.0, vartol=None,  checkperiod=1, verbose=False):
+def parallelAlgorithm(n, data, resolvents, W, Z, warmstartprimal=None, warmstartdual=None, itrs=1001, gamma=0.9, alpha=1.0, vartol=None,  checkperiod=1, verbose=False, dtype=np.float64):
     """Run the frugal resolvent splitting algorithm for W and Z matrices in parallel
 
     Args:
         n (int): the number of resolvents
         data (list): list containing the problem data for each resolvent
         resolvents (list): list of :math:`n` resolvent functions
-        W (ndarray): size (n, n) ndarray for the :math:`W` matrix
-        Z (ndarray): size (n, n) ndarray for the :math:`Z` matrix
+        W (ndarray): size (n, n) ndarray or sparse array for the :math:`W` matrix
+        Z (ndarray): size (n, n) ndarray or sparse array for the :math:`Z` matrix
         warmstartprimal (ndarray, optional): resolvent.shape ndarray for :math:`x` in v^0
         warmstartdual (list, optional): is a list of n ndarrays for :math:`u` which sums to 0 in v^0
         itrs (int, optional): the number of iterations
@@ -21,52 +27,97 @@ def parallelAlgorithm(n, data, resolvents, W, Z, warmstartprimal=None, warmstart
         earlyterm (int, optional): the number of variables that must agree to terminate early and solve explicitly for the remaining variables
         detectcycle (int, optional): the number of iterations to check for cycling
         verbose (bool, optional): True for verbose output
+        dtype (data-type, optional): the floating point type of the iterates and the values passed between nodes
 
     Returns:
         xbar (ndarray): the solution
         results (list): list of dictionaries with the results for each node
     """
-    L = -np.tril(Z, -1)
-
-    # Create the queues
-    man = mp.Manager()
-    Queue_Array, Comms_Data = requiredQueues(man, W, L)
-    if vartol is not None:
-        terminate = man.Value('i',0) #man.Event()
-        Queue_Array['terminate'] = [man.Queue() for _ in range(n)]
-
-        # Create evaluation process
-        evalProcess = mp.Process(target=evaluate, args=(n, Queue_Array['terminate'], terminate, vartol, itrs, checkperiod, verbose))
-        evalProcess.start()
-    else:
-        terminate = None
-    
-    # Set v0
-    if warmstartprimal is not None:
-        all_v = getWarmPrimal(warmstartprimal, L)
-        if verbose:print('warmstartprimal', all_v)
-    else:
-        all_v = [0 for _ in range(n)]
-    if warmstartdual is not None:
-        all_v = [all_v[i] + warmstartdual[i] for i in range(n)]
-        if verbose:print('warmstart final', all_v)
-
-    # Run subproblems in parallel
-    if verbose:
-        print('Starting Parallel Algorithm')
-        t = time()
-    with mp.Pool(processes=n) as p:
-        params = [(i, data[i], resolvents[i], all_v[i], W, L, Comms_Data[i], Queue_Array, gamma, alpha, itrs, terminate, verbose) for i in range(n)]
-        results = p.starmap(subproblem, params)
+    # Keep W and L in CSR form so setup scales with the nonzeros, not n^2
+    W = csr_array(W, dtype=dtype)
+    L = -tril(Z, -1, format='csr').astype(dtype)
+
+    # Assign nodes to processes round robin, with at most one process per core
+    try:
+        cpus = sorted(os.sched_getaffinity(0))
+    except AttributeError: # sched_getaffinity is only available on some platforms
+        cpus = None
+    P = min(n, len(cpus) if cpus else os.cpu_count() or 1)
+    process = [i % P for i in range(n)]
+
+    m = resolvents[0](data[0]).shape
+    Queue_Array = {}
+    evalProcess = None
+    procs = []
+    try:
+        # Create the queues
+        Queue_Array, Comms_Data = requiredQueues(W, L, m, process, dtype)
+        if vartol is not None:
+            # A raw shared int inherited by the workers; it has a single writer
+            # (evaluate), so no lock or manager process is needed per solve
+            terminate = mp.RawValue('i', 0)
+            # Bounding the terminate queues keeps every node within n iterations
+            # of the evaluator, so all nodes stop on the same iteration
+            # The evaluator is receiver n of its own arena
+            arena = SharedArena([(i, n) for i in range(n)], m, dtype, slots=n)
+            Queue_Array['terminate'] = [arena.queues[i, n] for i in range(n)]
+
+            # Create evaluation process
+            evalProcess = mp.Process(target=evaluate, args=(n, Queue_Array['terminate'], terminate, vartol, itrs, checkperiod, verbose))
+            evalProcess.start()
+        else:
+            terminate = None
+
+        # Set v0
+        if warmstartprimal is not None:
+            all_v = getWarmPrimal(warmstartprimal, L)
+            if verbose:print('warmstartprimal', all_v)
+        else:
+            all_v = [0 for _ in range(n)]
+        if warmstartdual is not None:
+            all_v = [all_v[i] + warmstartdual[i] for i in range(n)]
+            if verbose:print('warmstart final', all_v)
+
+        # Run subproblems in parallel
+        if verbose:
+            print('Starting Parallel Algorithm')
+            t = time()
+        # Queues are shared by inheritance, so the processes are started directly rather than from a pool
+        resultQueue = mp.Queue()
+        params = [(i, data[i], resolvents[i], all_v[i], W, L, Comms_Data[i], Queue_Array, gamma, alpha, itrs, terminate, verbose, dtype) for i in range(n)]
+        procs = [mp.Process(target=_runSubproblems, args=(resultQueue, params[p::P], cpus[p] if cpus else None)) for p in range(P)]
+        for p in procs:
+            p.start()
+        results = [None]*n
+        for _ in range(n):
+            i, result = resultQueue.get()
+            if isinstance(result, Exception):
+                raise result
+            results[i] = result
+        for p in procs:
+            p.join()
+        # Join the evaluation process
+        if evalProcess is not None:
+            evalProcess.join()
+    except BaseException:
+        # Stop the nodes and the evaluator, which may be blocked on a queue that is never filled
+        for p in procs + [evalProcess]:
+            if p is not None and p.is_alive():
+                p.terminate()
+        raise
+    finally:
+        for p in procs + [evalProcess]:
+            if p is not None and p.pid is not None:
+                p.join()
+        _closeQueues(Queue_Array)
     if verbose:
         alg_time = time()-t
         print('Parallel Algorithm Loop Time:', alg_time)
 
-    xbar = np.mean([results[i]['x'] for i in range(n)], axis=0)
-    # Join the evaluation process
-    if terminate is not None:        
-        evalProcess.join()
-        xdev = sum(abs(results[i]['x'] - xbar) for i in range(n))
+    X = np.empty((n,) + m, dtype=dtype)
+    for i, result in enumerate(results):
+        X[i] = result['x']
+    xbar = X.mean(axis=0)
 
 
     if verbose:
@@ -74,14 +125,18 @@ def parallelAlgorithm(n, data, resolvents, W, Z, warmstartprimal=None, warmstart
     return xbar, results
 
 
-def requiredQueues(man, W, L):
+def requiredQueues(W, L, shape, process=None, dtype=np.float64):
     '''
-    Returns the queues for the given W and L matrices
+    Returns the point to point queues for the given W and L matrices
 
     Args:
-        man (multiprocessing manager): the manager
-        W (ndarray): is the n x n W matrix
-        L (ndarray): is the n x nL matrix
+        W (ndarray): is the n x n W matrix, dense or sparse
+        L (ndarray): is the n x n L matrix, dense or sparse
+        shape (tuple): is the shape of the resolvent values passed between nodes
+        process (list, optional): is the index of the process running each node,
+                            queues between nodes in the same process are LocalQueues,
+                            the others are SharedArrayQueues in a single SharedArena
+        dtype (data-type, optional): is the type of the values passed between nodes
 
     Returns:
         Queue_Array (dict): is the dictionary of the queues with keys (i,j) for the queues from i to j
@@ -107,33 +162,274 @@ def requiredQueues(man, W, L):
         down_BQ = []
         Comms_Data.append({'WQ':WQ, 'up_LQ':up_LQ, 'down_LQ':down_LQ, 'up_BQ':up_BQ, 'down_BQ':down_BQ})
 
-    for i in range(n):
+    # Queues between processes are only placeholders until every edge is known,
+    # then they are all allocated together in one shared arena
+    shared = []
+    def newQueue(a, b):
+        if process is not None and process[a] == process[b]:
+            return LocalQueue()
+        shared.append((a, b))
+        return None
+
+    # Only visit the lower triangle entries where W or L is nonzero
+    W_nz = _lowerPattern(W)
+    L_nz = _lowerPattern(L)
+    for i, j in sorted(W_nz | L_nz):
         comms_i = Comms_Data[i]
-        for j in range(i):
-            comms_j = Comms_Data[j]
-            if not np.isclose(W[i,j],0.0):
-                if (i,j) not in Queue_Array:
-                    queue_ij = man.Queue()
-                    Queue_Array[i,j] = queue_ij
-                if (j,i) not in Queue_Array:
-                    queue_ji = man.Queue()
-                    Queue_Array[j,i] = queue_ji
-                if not np.isclose(L[i,j],0.0):
-                    comms_i['up_BQ'].append(j)
-                    comms_j['down_BQ'].append(i)
-                else:
-                    comms_j['WQ'].append(i)
-                    comms_i['WQ'].append(j)
-            elif not np.isclose(L[i,j],0.0):
-                if (j,i) not in Queue_Array:
-                    queue_ji = man.Queue()
-                    Queue_Array[j,i] = queue_ji
-                comms_i['up_LQ'].append(j)
-                comms_j['down_LQ'].append(i)
-
+        comms_j = Comms_Data[j]
+        if (i,j) in W_nz:
+            if (i,j) not in Queue_Array:
+                queue_ij = newQueue(i, j)
+                Queue_Array[i,j] = queue_ij
+            if (j,i) not in Queue_Array:
+                queue_ji = newQueue(j, i)
+                Queue_Array[j,i] = queue_ji
+            if (i,j) in L_nz:
+                comms_i['up_BQ'].append(j)
+                comms_j['down_BQ'].append(i)
+            else:
+                comms_j['WQ'].append(i)
+                comms_i['WQ'].append(j)
+        else:
+            if (j,i) not in Queue_Array:
+                queue_ji = newQueue(j, i)
+                Queue_Array[j,i] = queue_ji
+            comms_i['up_LQ'].append(j)
+            comms_j['down_LQ'].append(i)
+
+    if shared:
+        # SharedArena releases anything it created if it fails part way
+        Queue_Array.update(SharedArena(shared, shape, dtype).queues)
     return Queue_Array, Comms_Data
 
-def subproblem(i, data, problem_builder, v0, W, L, comms_data, queue, gamma=0.5, alpha=1.0, itrs=501, terminate=None, verbose=False):
+def _lowerPattern(A, atol=1e-8):
+    '''
+    Returns the set of (i, j) entries below the diagonal of A which are not close to zero
+
+    Args:
+        A (ndarray): is an n x n dense or sparse matrix
+        atol (float, optional): is the tolerance below which entries are treated as zero
+    '''
+    A = tril(A, -1, format='coo')
+    keep = np.abs(A.data) > atol
+    return set(zip(A.row[keep].tolist(), A.col[keep].tolist()))
+
+# Raw pipe reads and writes need real file descriptors, which Windows pipe connections do not have
+_RAW_PIPES = sys.platform != 'win32'
+
+class SharedArena():
+    """
+    Shared memory and notice pipes for a set of SharedArrayQueues
+
+    All the queues are rings of slots at their own offsets in one shared memory
+    block, and each receiving node has one NoticePipe which all of its senders
+    share. So the open files grow with the receiving nodes rather than the edges.
+
+    Args:
+        edges (list): is the list of (i, j) pairs for the queues from node i to node j
+        shape (tuple): is the shape of the values passed between nodes
+        dtype (data-type, optional): is the type of the values passed between nodes
+        slots (int, optional): is the number of slots in each queue
+    """
+
+    def __init__(self, edges, shape, dtype=np.float64, slots=2):
+        dtype = np.dtype(dtype)
+        size = dtype.itemsize*int(np.prod(shape))*slots
+        self.shm = SharedMemory(create=True, size=max(size*len(edges), 1))
+        self.notices = {}
+        self.queues = {}
+        try:
+            inbound = {}
+            for i, j in edges:
+                inbound[j] = inbound.get(j, 0) + 1
+            for j, count in inbound.items():
+                self.notices[j] = NoticePipe(count)
+            index = dict.fromkeys(inbound, 0)
+            for k, (i, j) in enumerate(edges):
+                self.queues[i,j] = SharedArrayQueue(self, k*size, shape, dtype, slots, self.notices[j], index[j])
+                index[j] += 1
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        """
+        Release the shared memory and the pipes, only called by the creating process
+        """
+        for notices in self.notices.values():
+            notices.close()
+        self.notices = {}
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+class NoticePipe():
+    """
+    Pipe which the senders to one node write a queue index to after filling a slot
+
+    Each notice is a single write of a few bytes, so notices from several senders
+    never interleave. The reader counts the notices for each of its queues, so a
+    notice for one queue can arrive while it is waiting on another.
+
+    Args:
+        nqueues (int): is the number of queues into the receiving node
+    """
+
+    def __init__(self, nqueues):
+        self.reader, self.writer = mp.Pipe(duplex=False)
+        self.pending = [0]*nqueues
+
+    def notify(self, notice):
+        if _RAW_PIPES:
+            os.write(self.writer.fileno(), notice)
+        else:
+            self.writer.send_bytes(notice)
+
+    def wait(self, index):
+        """
+        Blocks until there is a notice for queue index and consumes it
+        """
+        pending = self.pending
+        while pending[index] == 0:
+            if _RAW_PIPES:
+                # Whole notices are written atomically, so any read returns whole notices
+                data = os.read(self.reader.fileno(), 4096)
+                if not data:
+                    raise EOFError('the notice pipe was closed')
+            else:
+                data = self.reader.recv_bytes()
+            for k in memoryview(data).cast('I'):
+                pending[k] += 1
+        pending[index] -= 1
+
+    def close(self):
+        self.reader.close()
+        self.writer.close()
+
+class SharedArrayQueue():
+    """
+    Point to point queue for ndarrays of a fixed shape
+
+    Values are copied into a ring of slots in a SharedArena and the writer only
+    sends the queue index to the receiving node's NoticePipe, so nothing is
+    pickled. Slots are filled and read in order, so each end tracks the next
+    slot itself. The array returned by get is a view of the slot, so the reader
+    calls release once it is done with it.
+    """
+
+    def __init__(self, arena, offset, shape, dtype, slots, notices, index):
+        self.arena = arena
+        self.offset = offset
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+        self.slots = slots
+        self.notices = notices
+        self.index = index
+        self.notice = index.to_bytes(4, sys.byteorder)
+        self.free = mp.Semaphore(slots)
+        self.head = 0 # next slot to write
+        self.tail = 0 # next slot to read
+        self._buf = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_buf'] = None
+        return state
+
+    @property
+    def buf(self):
+        if self._buf is None:
+            self._buf = np.ndarray((self.slots,) + self.shape, dtype=self.dtype, buffer=self.arena.shm.buf, offset=self.offset)
+        return self._buf
+
+    def put(self, value):
+        self.free.acquire()
+        self.buf[self.head] = value
+        self.notices.notify(self.notice)
+        self.head = (self.head + 1) % self.slots
+
+    def get(self):
+        self.notices.wait(self.index)
+        value = self.buf[self.tail]
+        self.tail = (self.tail + 1) % self.slots
+        return value
+
+    def release(self):
+        self.free.release()
+
+def _closeQueues(Queue_Array):
+    '''
+    Closes the shared arenas behind the queues in Queue_Array
+    '''
+    queues = [q for key, q in Queue_Array.items() if key != 'terminate'] + Queue_Array.get('terminate', [])
+    arenas = {id(q.arena): q.arena for q in queues if isinstance(q, SharedArrayQueue)}
+    for arena in arenas.values():
+        arena.close()
+
+class LocalQueue():
+    """
+    Queue between two nodes run as threads of the same process
+
+    Values are passed by reference, so the sender must not modify them afterwards
+    """
+
+    def __init__(self):
+        self.queue = SimpleQueue()
+
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state):
+        self.queue = SimpleQueue()
+
+    def put(self, value):
+        self.queue.put(value)
+
+    def get(self):
+        return self.queue.get()
+
+    def release(self):
+        pass
+
+def _runSubproblems(resultQueue, params, cpu=None):
+    '''
+    Runs the subproblems for a group of nodes in one process, each node in its own thread
+
+    Args:
+        resultQueue (multiprocessing queue): is the queue for (i, result) tuples
+        params (list): is a list of the subproblem arguments for each node
+        cpu (int, optional): is the core to pin the process to
+    '''
+    # Keep the node state warm on one core and stop any BLAS loaded by the
+    # resolvents from starting a thread per core in every process
+    if cpu is not None:
+        try:
+            os.sched_setaffinity(0, {cpu})
+        except OSError:
+            pass
+    for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ.setdefault(var, '1')
+    if len(params) == 1:
+        _runSubproblem(resultQueue, *params[0])
+        return
+    threads = [Thread(target=_runSubproblem, args=(resultQueue,) + p) for p in params]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+def _runSubproblem(resultQueue, i, *args):
+    '''
+    Runs subproblem for node i and puts (i, result) on the result queue
+    '''
+    try:
+        resultQueue.put((i, subproblem(i, *args)))
+    except Exception as e:
+        resultQueue.put((i, e))
+        raise
+
+def subproblem(i, data, problem_builder, v0, W, L, comms_data, queue, gamma=0.5, alpha=1.0, itrs=501, terminate=None, verbose=False, dtype=np.float64):
     '''
     Solves the parallel subproblem for node i
 
@@ -155,6 +451,7 @@ def subproblem(i, data, problem_builder, v0, W, L, comms_data, queue, gamma=0.5,
         itrs (int): is the number of iterations
         terminate (multiprocessing value): is the termination value
         verbose (bool): is a boolean for verbose output
+        dtype (data-type): is the type of the local buffers
 
     Returns:
         tuple (x, results): 
@@ -169,10 +466,21 @@ def subproblem(i, data, problem_builder, v0, W, L, comms_data, queue, gamma=0.5,
     # Create the problem
     resolvent = problem_builder(data)
     m = resolvent.shape
-    v_temp = np.zeros(m)
-    local_v = v0 # + np.zeros(m)
-    local_r = np.zeros(m)
-    w_value = np.zeros(m)
+    v_temp = np.zeros(m, dtype=dtype)
+    local_v = np.zeros(m, dtype=dtype)
+    local_v += v0
+    local_r = np.zeros(m, dtype=dtype)
+    w_value = np.zeros(m, dtype=dtype)
+    tmp = np.empty(m, dtype=dtype)
+    y_buf = np.empty(m, dtype=dtype)
+
+    # Build the receive and send schedules once, outside the iteration loop
+    # Each receive is a queue and the (buffer, coefficient) pairs its value is added into
+    Wii = W[i,i]
+    up_recv = [(queue[k,i], ((local_r, L[i,k]),)) for k in comms_data['up_LQ']]
+    up_recv += [(queue[k,i], ((local_r, L[i,k]), (v_temp, W[i,k]))) for k in comms_data['up_BQ']]
+    w_recv = [(queue[k,i], ((v_temp, W[i,k]),)) for k in comms_data['WQ'] + comms_data['down_BQ']]
+    sends = [queue[i,k].put for k in comms_data['down_LQ'] + comms_data['down_BQ'] + comms_data['WQ'] + comms_data['up_BQ']]
 
     # Iterate over the problem
     itr = 0
@@ -185,48 +493,30 @@ def subproblem(i, data, problem_builder, v0, W, L, comms_data, queue, gamma=0.5,
                 break
                 #terminate.value = itr + 1
             itrs = terminate.value
+            # The final iteration is fixed, so stop checking and reporting
+            terminate = None
         if itr % itr_period == 0:
             print(f'Node {i} iteration {itr}')
 
-        # Get data from upstream L queue
-        for k in comms_data['up_LQ']:
-            local_r += L[i,k]*queue[k,i].get()
-            
-        # Pull from the B queues, update r and v_temp
-        for k in comms_data['up_BQ']:
-            temp = queue[k,i].get()
-            local_r += L[i,k]*temp
-            v_temp += W[i,k]*temp
+        # Get data from upstream L and B queues, update r and v_temp
+        _receive(up_recv, tmp)
 
         # Solve the problem
-        w_value = resolvent.prox(local_v + local_r, alpha)
-
-            
-
-        # Put data in downstream queues
-        for k in comms_data['down_LQ']:
-            queue[i,k].put(w_value)
-        for k in comms_data['down_BQ']:
-            queue[i,k].put(w_value)
-
-        # Put data in upstream W queues
-        for k in comms_data['WQ']:
-            queue[i,k].put(w_value)
-        for k in comms_data['up_BQ']:
-            queue[i,k].put(w_value)
-
-        # Update v from all W queues
-        for k in comms_data['WQ']:         
-            v_temp += W[i,k]*queue[k,i].get() 
-            
-        # Update v from all B queues
-        for k in comms_data['down_BQ']:
-            v_temp += W[i,k]*queue[k,i].get()
-        
-        v_update = gamma*(W[i,i]*w_value+v_temp)
+        np.add(local_v, local_r, out=y_buf)
+        w_value = resolvent.prox(y_buf, alpha)
+        # Some resolvents return their input unchanged, and y_buf is rewritten next iteration
+        if np.may_share_memory(w_value, y_buf):
+            w_value = w_value.copy()
+
+        # Put data in downstream queues and upstream W queues
+        for put in sends:
+            put(w_value)
+
+        # Update v from all W and B queues
+        _receive(w_recv, tmp)
+
+        v_update = _vupdate(local_v, w_value, v_temp, Wii, gamma, tmp)
 
-        local_v = local_v - v_update
-        
         # Terminate if needed
         if terminate is not None:
             queue['terminate'][i].put(v_update)
@@ -240,6 +530,54 @@ def subproblem(i, data, problem_builder, v0, W, L, comms_data, queue, gamma=0.5,
         return {'x':w_value, 'v':local_v, 'log':resolvent.log}
     return {'x':w_value, 'v':local_v}
 
+def _receive(schedule, tmp):
+    '''
+    Gets a value from each queue in the schedule and adds it into the paired buffers
+
+    Args:
+        schedule (list): list of (queue, ((buf, coef), ...)) tuples
+        tmp (ndarray): scratch buffer the shape of the values
+    '''
+    for q, targets in schedule:
+        msg = q.get()
+        for buf, coef in targets:
+            _accumulate(buf, coef, msg, tmp)
+        q.release()
+
+def _accumulate(buf, coef, msg, tmp):
+    '''
+    Adds coef*msg into buf in place
+
+    Args:
+        buf (ndarray): the buffer to update
+        coef (float): the scalar coefficient
+        msg (ndarray): the received value
+        tmp (ndarray): scratch buffer the shape of buf
+    '''
+    np.multiply(msg, coef, out=tmp)
+    buf += tmp
+
+def _vupdate(local_v, w_value, v_temp, Wii, gamma, tmp):
+    '''
+    Applies :math:`v \\leftarrow v - \\gamma (W_{ii} x_i + \\sum_{k \\neq i} W_{ik} x_k)` in place
+
+    Args:
+        local_v (ndarray): the local consensus variable, updated in place
+        w_value (ndarray): the local resolvent output
+        v_temp (ndarray): the accumulated off diagonal W terms, overwritten with the update
+        Wii (float): the diagonal entry of W
+        gamma (float): the consensus parameter
+        tmp (ndarray): scratch buffer the shape of local_v
+
+    Returns:
+        v_temp (ndarray): the update subtracted from local_v
+    '''
+    np.multiply(w_value, Wii, out=tmp)
+    v_temp += tmp
+    v_temp *= gamma
+    local_v -= v_temp
+    return v_temp
+
 def evaluate(n, terminateQueue, terminate, vartol, itrs, checkperiod=1, verbose=False):
     """
     Evaluate the termination conditions and set the terminate value if needed
@@ -255,24 +593,31 @@ def evaluate(n, terminateQueue, terminate, vartol, itrs, checkperiod=1, verbose=
         verbose (bool): True for verbose output
         
     """
-    v = []
+    # Stack the updates so the check is a single vectorized norm
+    v = np.empty((n,) + terminateQueue[0].shape, dtype=terminateQueue[0].dtype)
+    vflat = v.reshape(n, -1)
     for i in range(n):
-        v.append(terminateQueue[i].get())
+        v[i] = terminateQueue[i].get()
+        terminateQueue[i].release()
     #n = len(x) # x is just from node 0
     varcounter = 0
     itr = 0
     itrs -= n
     while itr < itrs:
         if verbose:print('iteration', itr+1)
-        prev_v = v.copy()
         for i in range(n):
             v[i] = terminateQueue[i].get()
-        delta = sum(np.linalg.norm(v[i]) for i in range(n))
+            terminateQueue[i].release()
+        # Row norms without the squared temporary np.linalg.norm allocates
+        delta = np.sqrt(np.einsum('ij,ij->i', vflat, vflat)).sum()
         if verbose:print("vartol check delta", delta)
         if delta < vartol:
             varcounter += 1
             if varcounter >= n:
                 terminate.value = itr + 2*n
+                # Unblock any node waiting to report before it sees the terminate value
+                for q in terminateQueue:
+                    q.release()
                 if verbose:
                     print('Converged on vartol on iteration', itr)
                 break
@@ -1,17 +1,20 @@
 import numpy as np
+from scipy.sparse import tril, csr_array
 from oars.algorithms.helpers import ConvergenceChecker, getWarmPrimal
 from time import time
+from concurrent.futures import ThreadPoolExecutor
+from inspect import signature
 
-def serialAlgorithm(n, data, resolvents, W, Z, warmstartprimal=None, warmstartdual=None, itrs=1001, gamma=0.9, alpha=1.0, vartol=None, objtol=None, objective=None, checkperiod=10, verbose=False):
+def serialAlgorithm(n, data, resolvents, W, Z, warmstartprimal=None, warmstartdual=None, itrs=1001, gamma=0.9, alpha=1.0, vartol=None, objtol=None, objective=None, checkperiod=10, verbose=False, dtype=np.float64):
     """
     Run the frugal resolvent splitting algorithm defined by Z and W in serial
 
     Args:
         n (int): the number of resolvents
         data (list): list containing the problem data for each resolvent
-        resolvents (list): list of :math:`n` resolvent classes
-        W (ndarray): size (n, n) ndarray for the :math:`W` matrix
-        Z (ndarray): size (n, n) ndarray for the :math:`Z` matrix
+        resolvents (list): list of :math:`n` resolvent classes, a prox which takes an out argument writes the iterate in place
+        W (ndarray): size (n, n) ndarray or sparse array for the :math:`W` matrix
+        Z (ndarray): size (n, n) ndarray or sparse array for the :math:`Z` matrix
         warmstartprimal (ndarray, optional): resolvent.shape ndarray for :math:`x` in v^0
         warmstartdual (list, optional): is a list of n ndarrays for :math:`u` which sums to 0 in v^0
         itrs (int, optional): the number of iterations
@@ -20,8 +23,10 @@ def serialAlgorithm(n, data, resolvents, W, Z, warmstartprimal=None, warmstartdu
         vartol (float, optional): is the variable tolerance
         objtol (float, optional): is the objective tolerance
         objective (function, optional): the objective function
-        checkperiod (int, optional): the period to check for convergence
+        checkperiod (int, optional): the period to check for convergence, n consecutive checks must pass,
+                            so convergence is reported no earlier than iteration n*checkperiod
         verbose (bool, optional): True for verbose output
+        dtype (data-type, optional): the floating point type of the iterates
 
     Returns:
         x (ndarray): the solution
@@ -37,30 +42,40 @@ def serialAlgorithm(n, data, resolvents, W, Z, warmstartprimal=None, warmstartdu
         >>> proxs = [quadprox]*n
         >>> Z, W = getFull(n)
         >>> x, results = serialAlgorithm(n, vals, proxs, W, Z, itrs=1000, vartol=1e-6, gamma=1.0)
-        Converged in objective value, iteration 13
+        Converged in value, iteration 40
         >>> x
-        10.999999999990674
+        10.999999999999977
         >>> results
-        [{'x': 10.999999999906539, 'v': 22.00000000003744}, {'x': 11.000000000103075, 'v': 13.66666666663539}, {'x': 10.999999999962412, 'v': 4.333333333327117}, {'x': 10.999999999990674, 'v': -40.0}]
+        [{'x': 10.999999999999977, 'v': 21.999999999999954}, {'x': 10.999999999999977, 'v': 13.666666666666636}, {'x': 10.999999999999977, 'v': 4.333333333333318}, {'x': 10.999999999999977, 'v': -40.0}]
 
     """
     # Initialize the resolvents and variables
-    all_x = []
     for i in range(n):
         resolvents[i] = resolvents[i](data[i])
-        if i == 0:
-            m = resolvents[0].shape
-        x = np.zeros(m)
-        all_x.append(x)
+    m = resolvents[0].shape
     if warmstartprimal is not None:
-        all_v = getWarmPrimal(warmstartprimal, L)
+        all_v = getWarmPrimal(warmstartprimal, -tril(Z, -1, format='csr'))
         if verbose:print('warmstartprimal', all_v)
     else:
-        all_v = [np.zeros(m) for _ in range(n)]
+        all_v = [np.zeros(m, dtype=dtype) for _ in range(n)]
     if warmstartdual is not None:
         all_v = [all_v[i] + warmstartdual[i] for i in range(n)]
         if verbose:print('warmstart final', all_v)
 
+    # Stack x and v so the Z and W products are single matrix multiplies
+    all_x = np.zeros((n,) + m, dtype=dtype)
+    all_v = np.array(all_v, dtype=dtype).reshape(all_x.shape)
+    X = all_x.reshape(n, -1)
+    V = all_v.reshape(n, -1)
+
+    # Nonzero columns and values of each row of the strictly lower part of Z
+    Zl = tril(Z, -1, format='csr').astype(dtype)
+    Zrows = [(Zl.indices[Zl.indptr[i]:Zl.indptr[i+1]], Zl.data[Zl.indptr[i]:Zl.indptr[i+1]]) for i in range(n)]
+    # Resolvents which accept out write straight into their row of all_x,
+    # except when verbose needs the previous x for the iteration difference
+    write_out = [not verbose and _acceptsOut(resolvents[i]) for i in range(n)]
+    Wcsr = csr_array(W, dtype=dtype)
+
     # Run the algorithm
     if verbose:
         print('Starting Serial Algorithm')
@@ -68,43 +83,58 @@ def serialAlgorithm(n, data, resolvents, W, Z, warmstartprimal=None, warmstartdu
         start_time = time()
     convergence = ConvergenceChecker(vartol, objtol, counter=n, objective=objective, data=data, x=all_x) 
     verbose_itr = 1
-    counter = checkperiod
+    # Convergence is checked on a snapshot in a background thread while the next
+    # iterations run, and the result is collected at the following check
+    pending = None
+    pending_itr = None
+    y_buf = np.empty(m, dtype=dtype)
     xresults = []
     vresults = []
-    wx = [np.zeros(m) for _ in range(n)]
-    for itr in range(itrs):
-        if verbose and itr % verbose_itr == 0:
-            print(f'Iteration {itr+1}')
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        for itr in range(itrs):
+            if verbose and itr % verbose_itr == 0:
+                print(f'Iteration {itr+1}')
 
-        for i in range(n):
-            resolvent = resolvents[i]
-            y = all_v[i] - sum(Z[i,j]*all_x[j] for j in range(i))
-            x = resolvent.prox(y, alpha)
-            if verbose: 
-                diffs[i] = np.linalg.norm(x - all_x[i])
-                print("B/t iteration difference norm for", i, ":", diffs[i])
-            all_x[i] = x #resolvent.prox(y, alpha)
+            for i in range(n):
+                resolvent = resolvents[i]
+                cols, vals = Zrows[i]
+                np.subtract(all_v[i], (vals @ X[cols]).reshape(m), out=y_buf)
+                if write_out[i]:
+                    resolvent.prox(y_buf, alpha, out=all_x[i])
+                    continue
+                x = resolvent.prox(y_buf, alpha)
+                if verbose: 
+                    diffs[i] = np.linalg.norm(x - all_x[i])
+                    print("B/t iteration difference norm for", i, ":", diffs[i])
+                all_x[i] = x
 
-        for i in range(n):     
-            wx[i] = sum(W[i,j]*all_x[j] for j in range(n))       
-            all_v[i] = all_v[i] - gamma*wx[i]
+            wx = gamma*(Wcsr @ X)
+            V -= wx
             if verbose:
-                print("Change in w", i, ":", np.linalg.norm(gamma*wx[i]))
-        if verbose and itr % verbose_itr == 0:
-            for i in range(n):    
-                print("Difference across x", i, i-1, np.linalg.norm(all_x[i]-all_x[i-1]))
-            for i in range(n):
-                print('x', i, all_x[i])
-                print('v', i, all_v[i])
-            xresults.append(all_x.copy())
-            vresults.append(all_v.copy())
-        if convergence.check(all_x, verbose=verbose):
-            print('Converged in value, iteration', itr+1)
-            break
-        
+                for i in range(n):
+                    print("Change in w", i, ":", np.linalg.norm(wx[i]))
+            if verbose and itr % verbose_itr == 0:
+                for i in range(n):    
+                    print("Difference across x", i, i-1, np.linalg.norm(all_x[i]-all_x[i-1]))
+                for i in range(n):
+                    print('x', i, all_x[i])
+                    print('v', i, all_v[i])
+                xresults.append(all_x.copy())
+                vresults.append(all_v.copy())
+            if (itr+1) % checkperiod == 0:
+                if pending is not None and pending.result():
+                    print('Converged in value, iteration', pending_itr)
+                    break
+                pending = executor.submit(convergence.check, all_x.copy(), verbose=verbose)
+                pending_itr = itr+1
+        else:
+            # The loop ran out of iterations, so collect the last check here
+            if pending is not None and pending.result():
+                print('Converged in value, iteration', pending_itr)
+
     if verbose:
         print('Serial Algorithm Loop Time:', time()-start_time)
-    x = sum(all_x)/n
+    x = all_x.mean(axis=0)
     
     # Build results list
     results = []
@@ -118,4 +148,11 @@ def serialAlgorithm(n, data, resolvents, W, Z, warmstartprimal=None, warmstartdu
         results.append({'xresults':xresults, 'vresults':vresults})
     return x, results
 
-
+def _acceptsOut(resolvent):
+    '''
+    Returns True if the prox method of the resolvent takes an out argument
+    '''
+    try:
+        return 'out' in signature(resolvent.prox).parameters
+    except (TypeError, ValueError): # no signature is available for some builtins
+        return False
@@ -20,6 +20,8 @@ def solve(n, data, resolvents, W, Z, parallel=False, **kwargs):
                 - gamma (float): the consensus parameter
                 - alpha (float): the resolvent scaling parameter
                 - verbose (bool): whether to print verbose output
+                - vartol (float): the variable tolerance, n consecutive checks every checkperiod
+                  iterations must pass, so convergence is reported no earlier than iteration n*checkperiod
 
     Returns:
         x, results (ndarray, list): tuple with the solution and a list of dictionaries with the results for each resolvent
@@ -34,11 +36,11 @@ def solve(n, data, resolvents, W, Z, parallel=False, **kwargs):
         >>> proxs = [quadprox]*n
         >>> Z, W = getFull(n)
         >>> x, results = solve(n, vals, proxs, W, Z, itrs=1000, vartol=1e-6, gamma=1.0)
-        Converged in objective value, iteration 13
+        Converged in value, iteration 40
         >>> x
-        10.999999999990674
+        10.999999999999977
         >>> results
-        [{'x': 10.999999999906539, 'v': 22.00000000003744}, {'x': 11.000000000103075, 'v': 13.66666666663539}, {'x': 10.999999999962412, 'v': 4.333333333327117}, {'x': 10.999999999990674, 'v': -40.0}]
+        [{'x': 10.999999999999977, 'v': 21.999999999999954}, {'x': 10.999999999999977, 'v': 13.666666666666636}, {'x': 10.999999999999977, 'v': 4.333333333333318}, {'x': 10.999999999999977, 'v': -40.0}]
         '''
 
     if parallel:
@@ -65,6 +67,8 @@ def solveMT(n, data, resolvents, **kwargs):
                 - gamma (float): the consensus parameter
                 - alpha (float): the resolvent scaling parameter
                 - verbose (bool): whether to print verbose output
+                - vartol (float): the variable tolerance, n consecutive checks every checkperiod
+                  iterations must pass, so convergence is reported no earlier than iteration n*checkperiod
 
     Returns:
         x, results (ndarray, list): tuple with the solution and a list of dictionaries with the results for each resolvent
@@ -77,11 +81,11 @@ def solveMT(n, data, resolvents, **kwargs):
         >>> n = len(vals)
         >>> proxs = [quadprox]*n
         >>> x, results = solveMT(n, vals, proxs, itrs=1000, vartol=1e-6, gamma=1.0)
-        Converged in objective value, iteration 69
+        Converged in value, iteration 100
         >>> x
-        10.999999857565648
+        10.999999999996165
         >>> results
-        [{'x': 10.999999565156383, 'v': 21.99999932717702}, {'x': 10.999999762020636, 'v': 9.99999996819179}, {'x': 10.99999996819179, 'v': 8.00000013489378}, {'x': 11.000000134893778, 'v': -39.999999430262605}]
+        [{'x': 10.999999999988294, 'v': 21.999999999981885}, {'x': 10.999999999993591, 'v': 9.999999999999142}, {'x': 10.99999999999914, 'v': 8.000000000003629}, {'x': 11.000000000003629, 'v': -39.99999999998467}]
     '''
 
     Z, W = getMT(n)
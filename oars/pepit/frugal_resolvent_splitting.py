@@ -1,9 +1,12 @@
-from PEPit import PEP, null_point, Constraint
+from PEPit import PEP, null_point
 from PEPit.primitive_steps import proximal_step
 from PEPit.functions import SmoothStronglyConvexFunction
-from numpy import array
+from numpy import array, flatnonzero, ascontiguousarray, float64
+from .helpers import solvePEP
+import os
+from concurrent.futures import ProcessPoolExecutor
 
-def wc_frugal_resolvent_splitting(L, W, lipschitz_values, mu_values, operator=SmoothStronglyConvexFunction, alpha=1, gamma=0.5, wrapper="cvxpy", solver=None, verbose=1):
+def wc_frugal_resolvent_splitting(L, W, lipschitz_values, mu_values, operator=SmoothStronglyConvexFunction, alpha=1, gamma=0.5, wrapper="cvxpy", solver="MOSEK", verbose=1):
     """
     Consider the the monotone inclusion problem
 
@@ -66,6 +69,9 @@ def wc_frugal_resolvent_splitting(L, W, lipschitz_values, mu_values, operator=Sm
         gamma (float): step size parameter.
         wrapper (str): the name of the wrapper to be used.
         solver (str): the name of the solver the wrapper should use.
+                      MOSEK is the default (free academic licenses are available from mosek.com);
+                      CLARABEL is used if MOSEK is not installed or the MOSEK solve fails;
+                      with MOSEK installed but unlicensed, PEPit runs SCS instead.
         verbose (int): level of information details to print.
 
                         - -1: No verbose at all.
@@ -86,10 +92,10 @@ def wc_frugal_resolvent_splitting(L, W, lipschitz_values, mu_values, operator=Sm
                             gamma=0.5,
                             wrapper="cvxpy", 
                             verbose=1)
-        ``(PEPit) Setting up the problem: size of the Gram matrix: 8x8
+        ``(PEPit) Setting up the problem: size of the Gram matrix: 6x6
         (PEPit) Setting up the problem: performance measure is the minimum of 1 element(s)
         (PEPit) Setting up the problem: Adding initial conditions and general constraints ...
-        (PEPit) Setting up the problem: initial conditions and general constraints (3 constraint(s) added)
+        (PEPit) Setting up the problem: initial conditions and general constraints (1 constraint(s) added)
         (PEPit) Setting up the problem: interpolation conditions for 2 function(s)
                                 Function 1 : Adding 2 scalar constraint(s) ...
                                 Function 1 : 2 scalar constraint(s) added
@@ -98,21 +104,21 @@ def wc_frugal_resolvent_splitting(L, W, lipschitz_values, mu_values, operator=Sm
         (PEPit) Setting up the problem: additional constraints for 0 function(s)
         (PEPit) Compiling SDP
         (PEPit) Calling SDP solver
-        (PEPit) Solver status: optimal (wrapper:cvxpy, solver: MOSEK); optimal value: 0.6941881289170055
-        (PEPit) Postprocessing: solver's output is not entirely feasible (smallest eigenvalue of the Gram matrix is: -3.01e-09 < 0).
+        (PEPit) Solver status: optimal (wrapper:cvxpy, solver: CLARABEL); optimal value: 0.6941669757802451
+        (PEPit) Postprocessing: solver's output is not entirely feasible (smallest eigenvalue of the Gram matrix is: -4.19e-10 < 0).
         Small deviation from 0 may simply be due to numerical error. Big ones should be deeply investigated.
         In any case, from now the provided values of parameters are based on the projection of the Gram matrix onto the cone of symmetric semi-definite matrix.
         (PEPit) Primal feasibility check:
-                        The solver found a Gram matrix that is positive semi-definite up to an error of 3.0070570485427986e-09
-                        All the primal scalar constraints are verified up to an error of 7.876224117353559e-09
+                        The solver found a Gram matrix that is positive semi-definite up to an error of 4.192862807103103e-10
+                        All the primal scalar constraints are verified up to an error of 2.3932619497291086e-09
         (PEPit) Dual feasibility check:
                         The solver found a residual matrix that is positive semi-definite
                         All the dual scalar values associated with inequality constraints are nonnegative
-        (PEPit) The worst-case guarantee proof is perfectly reconstituted up to an error of 2.165773640630705e-06
-        (PEPit) Final upper bound (dual): 0.6941851987362065 and lower bound (primal example): 0.6941881289170055
-        (PEPit) Duality gap: absolute: -2.9301807989989825e-06 and relative: -4.2210183046061616e-06
+        (PEPit) The worst-case guarantee proof is perfectly reconstituted up to an error of 2.0541010670172e-08
+        (PEPit) Final upper bound (dual): 0.6941669740718677 and lower bound (primal example): 0.6941669757802451
+        (PEPit) Duality gap: absolute: -1.7083774395132423e-09 and relative: -2.4610468361636226e-09
         *** Example file: worst-case performance of parameterized frugal resolvent splitting` ***
-                PEPit guarantee:         ||v_(t+1)^0 - v_(t+1)^1||^2 <= 0.694185 ||v_(t)^0 - v_(t)^1||^2
+                PEPit guarantee:         ||v_(t+1)^0 - v_(t+1)^1||^2 <= 0.694167 ||v_(t)^0 - v_(t)^1||^2
         ``
         >>> comparison()
         ``
@@ -127,6 +133,13 @@ def wc_frugal_resolvent_splitting(L, W, lipschitz_values, mu_values, operator=Sm
 
     """
 
+    # Coerce the designs to contiguous floats once and find the nonzeros of each row
+    L = ascontiguousarray(L, dtype=float64)
+    W = ascontiguousarray(W, dtype=float64)
+    n = W.shape[0]
+    L_rows = [flatnonzero(L[i, :i]) for i in range(n)]
+    W_rows = [flatnonzero(W[i]) for i in range(n)]
+
     # Instantiate PEP
     problem = PEP()
 
@@ -134,44 +147,46 @@ def wc_frugal_resolvent_splitting(L, W, lipschitz_values, mu_values, operator=Sm
     operators = [problem.declare_function(operator, L=l, mu=mu) for l, mu in zip(lipschitz_values, mu_values)]
 
     # Then define the starting points v0 and v1
-    n = W.shape[0]
-    v0 = [problem.set_initial_point() for _ in range(n)]
-    v1 = [problem.set_initial_point() for _ in range(n)]
+    # Each lifted starting point sums to 0, so the last element is the negative sum of the others
+    v0 = [problem.set_initial_point() for _ in range(n-1)]
+    v1 = [problem.set_initial_point() for _ in range(n-1)]
+    v0.append(-sum(v0, start=null_point))
+    v1.append(-sum(v1, start=null_point))
     
     # Set the initial constraint that is the distance between v0 and v1
     problem.set_initial_condition(sum((v0[i] - v1[i]) ** 2 for i in range(n)) <= 1)
 
-    # Constraint on the lifted starting points so each sums to 0
-    v0constraint = Constraint(expression=sum((v0[i] for i in range(n)), start=null_point)**2, equality_or_inequality="equality")
-    v1constraint = Constraint(expression=sum((v1[i] for i in range(n)), start=null_point)**2, equality_or_inequality="equality")
-    problem.set_initial_condition(v0constraint)
-    problem.set_initial_condition(v1constraint)
-
-    # Define the step for each element of the lifted vector    
-    def resolvent(i, x, v, L, alpha):
-        Lx = sum((L[i, j]*x[j] for j in range(i)), start=null_point)
-        x, _, _ = proximal_step(v[i] + Lx, operators[i], alpha)
-        return x
-
+    # Step both starting points through the lifted resolvents together,
+    # only adding the nonzero terms of each row, most designs have sparse L
     x0 = []
     x1 = []
     for i in range(n):
-        x0.append(resolvent(i, x0, v0, L, alpha))
-        x1.append(resolvent(i, x1, v1, L, alpha))
+        y0 = v0[i]
+        y1 = v1[i]
+        for j, Lij in zip(L_rows[i], L[i, L_rows[i]].tolist()):
+            y0 = y0 + Lij*x0[j]
+            y1 = y1 + Lij*x1[j]
+        x0.append(proximal_step(y0, operators[i], alpha)[0])
+        x1.append(proximal_step(y1, operators[i], alpha)[0])
 
     z0 = []
     z1 = []
     for i in range(n):
-        z0.append(v0[i] - gamma*W[i,:]@x0)
-        z1.append(v1[i] - gamma*W[i,:]@x1)
+        z0_i = v0[i]
+        z1_i = v1[i]
+        for j, Wij in zip(W_rows[i], W[i, W_rows[i]].tolist()):
+            gW = gamma*Wij
+            z0_i = z0_i - gW*x0[j]
+            z1_i = z1_i - gW*x1[j]
+        z0.append(z0_i)
+        z1.append(z1_i)
 
     
     # Set the performance metric to the distance between z0 and z1
     problem.set_performance_metric(sum((z0[i] - z1[i]) ** 2 for i in range(n)))
     
     # Solve the PEP
-    pepit_verbose = max(verbose, 0)
-    pepit_tau = problem.solve(wrapper=wrapper, solver=solver, verbose=pepit_verbose)
+    pepit_tau = solvePEP(problem, wrapper=wrapper, solver=solver, verbose=max(verbose, 0))
 
     # Print conclusion if required
     if verbose != -1:
@@ -238,26 +253,32 @@ def comparison():
     print('Design\t', '0.5 step size\t', 'Optimal step size\t', 'Optimal W matrix\t')
     print('---------------------------------------------------------------------')
 
-    # Malitsky-Tam [3]
-    tau_MT = wc_frugal_resolvent_splitting(L_MT, W_MT, lipschitz_values, mu_values, gamma=0.5, verbose=-1)
-    tau_MT_opt_step = wc_frugal_resolvent_splitting(L_MT, W_MT, lipschitz_values, mu_values, gamma=1.09, verbose=-1)
-    tau_MT_opt_W = wc_frugal_resolvent_splitting(L_MT, W_MT_opt, lipschitz_values, mu_values, gamma=1, verbose=-1)
+    # The nine PEPs are independent, so solve them in parallel
+    cases = [(L_MT, W_MT, 0.5), (L_MT, W_MT, 1.09), (L_MT, W_MT_opt, 1),             # Malitsky-Tam [3]
+             (L_full, W_full, 0.5), (L_full, W_full, 1.09), (L_full, W_full_opt, 1), # Fully Connected
+             (L_block, W_block, 0.5), (L_block, W_block, 1.09), (L_block, W_block_opt, 1)] # 2-Block [1]
+    # Only use the cores this process may run on, so restricted containers are not oversubscribed
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError: # sched_getaffinity is only available on some platforms
+        cores = os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=min(len(cases), cores)) as executor:
+        taus = list(executor.map(_comparisonTau, [(L, W, lipschitz_values, mu_values, gamma) for L, W, gamma in cases]))
+    tau_MT, tau_MT_opt_step, tau_MT_opt_W, tau_f, tau_f_opt_step, tau_f_opt_W, tau_b, tau_b_opt_step, tau_b_opt_W = taus
+
     # string format for the output of the function rounding to 3 decimal places with tab separation
     print('MT \t {:.3f} \t\t {:.3f} \t\t\t {:.3f}'.format(tau_MT, tau_MT_opt_step, tau_MT_opt_W))
-
-    # Fully Connected
-    tau_f = wc_frugal_resolvent_splitting(L_full, W_full, lipschitz_values, mu_values, gamma=0.5, verbose=-1)
-    tau_f_opt_step = wc_frugal_resolvent_splitting(L_full, W_full, lipschitz_values, mu_values, gamma=1.09, verbose=-1)
-    tau_f_opt_W = wc_frugal_resolvent_splitting(L_full, W_full_opt, lipschitz_values, mu_values, gamma=1, verbose=-1)
     print('Full \t {:.3f} \t\t {:.3f} \t\t\t {:.3f}'.format(tau_f, tau_f_opt_step, tau_f_opt_W))
-
-    # 2-Block [1]
-    tau_b = wc_frugal_resolvent_splitting(L_block, W_block, lipschitz_values, mu_values, gamma=0.5, verbose=-1)
-    tau_b_opt_step = wc_frugal_resolvent_splitting(L_block, W_block, lipschitz_values, mu_values, gamma=1.09, verbose=-1)
-    tau_b_opt_W = wc_frugal_resolvent_splitting(L_block, W_block_opt, lipschitz_values, mu_values, gamma=1, verbose=-1)
     print('Block \t {:.3f} \t\t {:.3f} \t\t\t {:.3f}'.format(tau_b, tau_b_opt_step, tau_b_opt_W))
     return 0
 
+def _comparisonTau(case):
+    '''
+    Returns the contraction factor for one (L, W, lipschitz_values, mu_values, gamma) case of comparison
+    '''
+    L, W, lipschitz_values, mu_values, gamma = case
+    return wc_frugal_resolvent_splitting(L, W, lipschitz_values, mu_values, gamma=gamma, verbose=-1)
+
 if __name__ == "__main__":
     # Douglas-Rachford [5]
     pepit_tau = wc_frugal_resolvent_splitting(
@@ -0,0 +1,37 @@
+import importlib.util
+from cvxpy import SolverError
+
+def pickSolver(solver):
+    '''
+    Returns the solver to request from CVXPY, CLARABEL in place of MOSEK when MOSEK is not installed
+
+    Args:
+        solver (str): the name of the requested solver
+    '''
+    if solver == "MOSEK" and importlib.util.find_spec("mosek") is None:
+        return "CLARABEL"
+    return solver
+
+def solvePEP(problem, wrapper="cvxpy", solver="MOSEK", verbose=0):
+    '''
+    Solves the PEP, retrying with CLARABEL if a MOSEK solve raises a SolverError
+
+    With MOSEK installed but not licensed, PEPit's cvxpy wrapper runs SCS instead
+    of MOSEK on its own, so no retry happens in that case
+
+    Args:
+        problem (PEP): the PEPit problem
+        wrapper (str): the name of the wrapper to be used
+        solver (str): the name of the requested solver
+        verbose (int): the PEPit verbosity level
+
+    Returns:
+        pepit_tau (float): worst-case value
+    '''
+    solver = pickSolver(solver)
+    try:
+        return problem.solve(wrapper=wrapper, solver=solver, verbose=verbose)
+    except SolverError:
+        if solver != "MOSEK":
+            raise
+        return problem.solve(wrapper=wrapper, solver="CLARABEL", verbose=verbose)
@@ -1,9 +1,10 @@
 from PEPit import PEP, null_point, Constraint
 from PEPit.primitive_steps import proximal_step
 from PEPit.functions import SmoothStronglyConvexFunction
-from numpy import array
+from numpy import array, flatnonzero, ascontiguousarray, float64
+from .helpers import solvePEP
 
-def wc_reduced_frugal_resolvent_splitting(L, M, lipschitz_values, mu_values, operator=SmoothStronglyConvexFunction, alpha=1, gamma=0.5, wrapper="cvxpy", solver=None, verbose=1):
+def wc_reduced_frugal_resolvent_splitting(L, M, lipschitz_values, mu_values, operator=SmoothStronglyConvexFunction, alpha=1, gamma=0.5, wrapper="cvxpy", solver="MOSEK", verbose=1):
     """
     Consider the the monotone inclusion problem
 
@@ -65,6 +66,9 @@ def wc_reduced_frugal_resolvent_splitting(L, M, lipschitz_values, mu_values, ope
         gamma (float): step size parameter.
         wrapper (str): the name of the wrapper to be used.
         solver (str): the name of the solver the wrapper should use.
+                      MOSEK is the default (free academic licenses are available from mosek.com);
+                      CLARABEL is used if MOSEK is not installed or the MOSEK solve fails;
+                      with MOSEK installed but unlicensed, PEPit runs SCS instead.
         verbose (int): level of information details to print.
 
                         - -1: No verbose at all.
@@ -126,6 +130,15 @@ def wc_reduced_frugal_resolvent_splitting(L, M, lipschitz_values, mu_values, ope
 
     """
 
+    # Coerce the designs to contiguous floats once and find the nonzeros of each row and column
+    L = ascontiguousarray(L, dtype=float64)
+    M = ascontiguousarray(M, dtype=float64)
+    n = L.shape[0]
+    d = M.shape[0]
+    L_rows = [flatnonzero(L[i, :i]) for i in range(n)]
+    M_rows = [flatnonzero(M[i]) for i in range(d)]
+    M_cols = [flatnonzero(M[:, i]) for i in range(n)]
+
     # Instantiate PEP
     problem = PEP()
 
@@ -133,39 +146,46 @@ def wc_reduced_frugal_resolvent_splitting(L, M, lipschitz_values, mu_values, ope
     operators = [problem.declare_function(operator, L=l, mu=mu) for l, mu in zip(lipschitz_values, mu_values)]
 
     # Then define the starting points v0 and v1
-    n = L.shape[0]
-    d = M.shape[0]
     w0 = [problem.set_initial_point() for _ in range(d)]
     w1 = [problem.set_initial_point() for _ in range(d)]
     
     # Set the initial constraint that is the distance between v0 and v1
     problem.set_initial_condition(sum((w0[i] - w1[i]) ** 2 for i in range(d)) <= 1)
 
-    # Define the step for each element of the lifted vector    
-    def resolvent(i, x, w, L, M, alpha):
-        Lx = sum((L[i, j]*x[j] for j in range(i)), start=null_point)
-        x, _, _ = proximal_step(-M.T[i,:]@w + Lx, operators[i], alpha)
-        return x
-
+    # Step both starting points through the lifted resolvents together, only
+    # adding the nonzero terms of -M^T w + L x for each row, most designs are sparse
     x0 = []
     x1 = []
     for i in range(n):
-        x0.append(resolvent(i, x0, w0, L, M, alpha))
-        x1.append(resolvent(i, x1, w1, L, M, alpha))
+        y0 = null_point
+        y1 = null_point
+        for k, Mki in zip(M_cols[i], M[M_cols[i], i].tolist()):
+            y0 = y0 - Mki*w0[k]
+            y1 = y1 - Mki*w1[k]
+        for j, Lij in zip(L_rows[i], L[i, L_rows[i]].tolist()):
+            y0 = y0 + Lij*x0[j]
+            y1 = y1 + Lij*x1[j]
+        x0.append(proximal_step(y0, operators[i], alpha)[0])
+        x1.append(proximal_step(y1, operators[i], alpha)[0])
 
     z0 = []
     z1 = []
     for i in range(d):
-        z0.append(w0[i] + gamma*M[i,:]@x0)
-        z1.append(w1[i] + gamma*M[i,:]@x1)
+        z0_i = w0[i]
+        z1_i = w1[i]
+        for j, Mij in zip(M_rows[i], M[i, M_rows[i]].tolist()):
+            gM = gamma*Mij
+            z0_i = z0_i + gM*x0[j]
+            z1_i = z1_i + gM*x1[j]
+        z0.append(z0_i)
+        z1.append(z1_i)
 
     
     # Set the performance metric to the distance between z0 and z1
     problem.set_performance_metric(sum((z0[i] - z1[i]) ** 2 for i in range(d)))
     
     # Solve the PEP
-    pepit_verbose = max(verbose, 0)
-    pepit_tau = problem.solve(wrapper=wrapper, solver=solver, verbose=pepit_verbose)
+    pepit_tau = solvePEP(problem, wrapper=wrapper, solver=solver, verbose=max(verbose, 0))
 
     # Print conclusion if required
     if verbose != -1:
@@ -1,6 +1,14 @@
 import numpy as np
+from scipy.linalg import eigh
 from time import time
 
+def _copyto(out, X):
+    """
+    Copy X into out and return out, for the prox branches that leave X unchanged
+    """
+    np.copyto(out, X)
+    return out
+
 class traceEqualityIndicator():
     """
     Class for the trace proximal operator
@@ -14,28 +22,32 @@ class traceEqualityIndicator():
         self.v = data['v'] # The value to match
         self.U = self.scale(self.A)
         self.shape = self.A.shape
+        self._tmp = np.empty(self.shape) # scratch for the scaled U
         self.log = []
 
     def scale(self, A):
         """
         Scale the matrix A by the squared Frobenius norm
         """    
-        return A/np.linalg.norm(A, 'fro')**2
+        return A/np.einsum('ij,ij->', A, A)
 
-    def prox(self, X, t=1):
+    def prox(self, X, t=1, out=None):
         """
         Compute the proximal operator of the trace norm
+
+        If out is given the result is written into it, otherwise a new array is returned
         """
         
         log = {}
         log['start'] = time()
-        ax = np.trace(self.A @ X)
+        ax = np.einsum('ij,ij->', self.A, X) # tr(AX) for symmetric A and X
         if ax == self.v:
             log['end'] = time()
             log['time'] = log['end'] - log['start']
             self.log.append(log)
-            return X
-        Y = X - (ax - self.v)*self.U
+            return X if out is None else _copyto(out, X)
+        np.multiply(self.U, ax - self.v, out=self._tmp)
+        Y = np.subtract(X, self._tmp, out=out)
         log['end'] = time()
         log['time'] = log['end'] - log['start']
         self.log.append(log)
@@ -50,28 +62,32 @@ class traceHalfspaceIndicator():
         self.A = A
         self.U = self.scale(A)
         self.shape = A.shape
+        self._tmp = np.empty(self.shape) # scratch for the scaled U
         self.log = []
 
     def scale(self, A):
         """
         Scale the matrix A by the squared Frobenius norm
         """    
-        return A/np.linalg.norm(A, 'fro')**2
+        return A/np.einsum('ij,ij->', A, A)
 
-    def prox(self, X, t=1):
+    def prox(self, X, t=1, out=None):
         """
         Compute the proximal operator of the trace norm
+
+        If out is given the result is written into it, otherwise a new array is returned
         """
         log = {}
         log['start'] = time()
-        ax = np.trace(self.A @ X)
+        ax = np.einsum('ij,ij->', self.A, X) # tr(AX) for symmetric A and X
         log['end'] = time()
         log['time'] = log['end'] - log['start']
         self.log.append(log)
         if ax >= 0:
-            return X
+            return X if out is None else _copyto(out, X)
         
-        return X - ax*self.U
+        np.multiply(self.U, ax, out=self._tmp)
+        return np.subtract(X, self._tmp, out=out)
     
 class psdCone():
     """
@@ -81,27 +97,49 @@ class psdCone():
     def __init__(self, dim):
         self.shape = dim
         self.log = []
+        self.npos = None # number of positive eigenvalues at the last projection
 
-    def prox(self, X, t=1):
+    def prox(self, X, t=1, out=None):
         """
         Compute the proximal operator of the PSD cone
+
+        If out is given the result is written into it, otherwise a new array is returned
         """
         log = {}
         log['start'] = time()
         try:
-            eig, vec = np.linalg.eigh(X)
-            eig[eig < 0] = 0
-        except:
-            print('Error in eigh')
-            print(X)
-
-        Y = vec @ np.diag(eig) @ vec.T
+            Y = self.project(X, out)
+        except np.linalg.LinAlgError:
+            # eigh can fail to converge on badly conditioned input, a tiny diagonal shift fixes it
+            Y = self.project(X + 1e-12*np.eye(X.shape[0]), out)
         
         log['end'] = time()
         log['time'] = log['end'] - log['start']
         self.log.append(log)
         return Y
 
+    def project(self, X, out=None):
+        """
+        Project X onto the PSD cone, into out if it is given
+
+        When few eigenvalues were positive (or negative) at the last call,
+        only that side of the spectrum is computed
+        """
+        n = X.shape[0]
+        if self.npos is not None and 4*self.npos <= n:
+            eig, vec = eigh(X, subset_by_value=(0, np.inf), driver='evr')
+            self.npos = len(eig)
+            # Scale the eigenvector columns instead of forming diag(eig)
+            return np.matmul(vec * eig, vec.T, out=out)
+        if self.npos is not None and 4*(n - self.npos) <= n:
+            eig, vec = eigh(X, subset_by_value=(-np.inf, 0), driver='evr')
+            self.npos = n - len(eig)
+            return np.subtract(X, (vec * eig) @ vec.T, out=out)
+        eig, vec = np.linalg.eigh(X)
+        np.maximum(eig, 0, out=eig)
+        self.npos = np.count_nonzero(eig)
+        return np.matmul(vec * eig, vec.T, out=out)
+
 from scipy.sparse.linalg import lobpcg
 class psdConeApprox():
     """
@@ -150,9 +188,9 @@ class psdConeApprox():
         """
         self.subspace_dim_history.append(self.U.shape[1])
         if self.is_subspace_positive:
-            return self.U @ np.diag(np.maximum(eig, 0)) @ self.U.T
+            return (self.U * np.maximum(eig, 0)) @ self.U.T
         else:
-            return X + self.U @ np.diag(np.maximum(eig, 0)) @ self.U.T
+            return X + (self.U * np.maximum(eig, 0)) @ self.U.T
 
     def project_exact(self, X):
         """
@@ -171,10 +209,10 @@ class psdConeApprox():
                 eig = -eig
             self.U = vec[:, start:stop]
             Y = self.construct_projection(X, eig[start:stop])
-        except:
+        except np.linalg.LinAlgError:
             print('Error in eigh')
             print(X)
-            raise(Exception)
+            raise
 
         return Y
 
@@ -204,10 +242,8 @@ class psdConeApprox():
                     eig = -eig
                 if sum(eig < self.zero_tol) > 0:
                     converged = True
-            except:
-                print('Error in lobpcg')
-                print(X)
-                raise(Exception)
+            except np.linalg.LinAlgError:
+                # lobpcg failed, use the exact projection
                 converged = False
             
 
@@ -228,14 +264,18 @@ class linearSubdiff():
         self.A = A
         self.shape = A.shape
         self.log = []
+        self._tmp = np.empty(self.shape) # scratch for t*A
 
-    def prox(self, X, t=1):
+    def prox(self, X, t=1, out=None):
         """
         Compute the proximal operator of the linear subdifferential
+
+        If out is given the result is written into it, otherwise a new array is returned
         """
         log = {}
         log['start'] = time()
-        Y = X - t*self.A
+        np.multiply(self.A, t, out=self._tmp)
+        Y = np.subtract(X, self._tmp, out=out)
         log['end'] = time()
         log['time'] = log['end'] - log['start']
         self.log.append(log)
@@ -251,14 +291,13 @@ class absprox():
     # Evaluates L1 norm
     def __call__(self, x):
         u = x - self.data
-        return sum(abs(u))
+        return np.abs(u).sum()
 
     # Evaluates L1 norm resolvent
     def prox(self, y, tau=1.0):
-        u = y - self.data
-        r = max(abs(u)-tau, 0)*np.sign(u) + self.data
-        # print(f"Data: {self.data}, y: {y}, u: {u}, r: {r}", flush=True)
-        return r
+        # Soft thresholding about data is y minus the difference clipped to [-tau, tau]
+        u = np.minimum(np.maximum(y - self.data, -tau), tau)
+        return y - u
 
     def __repr__(self):
         return "L1 norm resolvent"
@@ -1,8 +1,16 @@
 import numpy as np
+from scipy.linalg import eigh
 from time import time
 import warnings
 warnings.filterwarnings("error")
 
+def _copyto(out, X):
+    """
+    Copy X into out and return out, for the prox branches that leave X unchanged
+    """
+    np.copyto(out, X)
+    return out
+
 class nullProx():
     """
     Class for the null proximal operator
@@ -30,23 +38,26 @@ class ntraceEqualityIndicator():
         self.v = data['v'] # The value to match
         self.U = self.scale(self.A)
         self.shape = self.A.shape
+        self._tmp = np.empty(self.shape) # scratch for the scaled U
 
     def scale(self, A):
         """
         Scale the matrix A by the squared Frobenius norm
         """    
-        return A/np.linalg.norm(A, 'fro')**2
+        return A/np.einsum('ij,ij->', A, A)
 
-    def prox(self, X, t=1):
+    def prox(self, X, t=1, out=None):
         """
         Compute the proximal operator of the trace norm
+
+        If out is given the result is written into it, otherwise a new array is returned
         """
         
-        ax = np.trace(self.A @ X)
+        ax = np.einsum('ij,ij->', self.A, X) # tr(AX) for symmetric A and X
         if ax == self.v:
-            return X
-        Y = X - (ax - self.v)*self.U
-        return Y
+            return X if out is None else _copyto(out, X)
+        np.multiply(self.U, ax - self.v, out=self._tmp)
+        return np.subtract(X, self._tmp, out=out)
 
 class ntraceHalfspaceIndicator():
     """
@@ -57,22 +68,26 @@ class ntraceHalfspaceIndicator():
         self.A = A
         self.U = self.scale(A)
         self.shape = A.shape
+        self._tmp = np.empty(self.shape) # scratch for the scaled U
 
     def scale(self, A):
         """
         Scale the matrix A by the squared Frobenius norm
         """    
-        return A/np.linalg.norm(A, 'fro')**2
+        return A/np.einsum('ij,ij->', A, A)
 
-    def prox(self, X, t=1):
+    def prox(self, X, t=1, out=None):
         """
         Compute the proximal operator of the trace norm
+
+        If out is given the result is written into it, otherwise a new array is returned
         """
-        ax = np.trace(self.A @ X)
+        ax = np.einsum('ij,ij->', self.A, X) # tr(AX) for symmetric A and X
         if ax >= 0:
-            return X
+            return X if out is None else _copyto(out, X)
         
-        return X - ax*self.U
+        np.multiply(self.U, ax, out=self._tmp)
+        return np.subtract(X, self._tmp, out=out)
     
 class npsdCone():
     """
@@ -81,22 +96,44 @@ class npsdCone():
 
     def __init__(self, dim):
         self.shape = dim
+        self.npos = None # number of positive eigenvalues at the last projection
 
-    def prox(self, X, t=1):
+    def prox(self, X, t=1, out=None):
         """
         Compute the proximal operator of the PSD cone
+
+        If out is given the result is written into it, otherwise a new array is returned
         """
         try:
-            eig, vec = np.linalg.eigh(X)
-            eig[eig < 0] = 0
-        except:
-            print('Error in eigh')
-            print(X)
-
-        Y = vec @ np.diag(eig) @ vec.T
+            Y = self.project(X, out)
+        except np.linalg.LinAlgError:
+            # eigh can fail to converge on badly conditioned input, a tiny diagonal shift fixes it
+            Y = self.project(X + 1e-12*np.eye(X.shape[0]), out)
         
         return Y
 
+    def project(self, X, out=None):
+        """
+        Project X onto the PSD cone, into out if it is given
+
+        When few eigenvalues were positive (or negative) at the last call,
+        only that side of the spectrum is computed
+        """
+        n = X.shape[0]
+        if self.npos is not None and 4*self.npos <= n:
+            eig, vec = eigh(X, subset_by_value=(0, np.inf), driver='evr')
+            self.npos = len(eig)
+            # Scale the eigenvector columns instead of forming diag(eig)
+            return np.matmul(vec * eig, vec.T, out=out)
+        if self.npos is not None and 4*(n - self.npos) <= n:
+            eig, vec = eigh(X, subset_by_value=(-np.inf, 0), driver='evr')
+            self.npos = n - len(eig)
+            return np.subtract(X, (vec * eig) @ vec.T, out=out)
+        eig, vec = np.linalg.eigh(X)
+        np.maximum(eig, 0, out=eig)
+        self.npos = np.count_nonzero(eig)
+        return np.matmul(vec * eig, vec.T, out=out)
+
 
 from scipy.sparse.linalg import lobpcg
 class npsdConeApprox():
@@ -148,9 +185,9 @@ class npsdConeApprox():
         """
         self.subspace_dim_history.append(self.U.shape[1])
         if self.is_subspace_positive:
-            return self.U @ np.diag(np.maximum(eig, 0)) @ self.U.T
+            return (self.U * np.maximum(eig, 0)) @ self.U.T
         else:
-            return X + self.U @ np.diag(np.maximum(eig, 0)) @ self.U.T
+            return X + (self.U * np.maximum(eig, 0)) @ self.U.T
 
     def project_exact(self, X):
         """
@@ -171,10 +208,10 @@ class npsdConeApprox():
                 eig = -eig
             self.U = vec[:, start:stop]
             Y = self.construct_projection(X, eig[start:stop])
-        except:
+        except np.linalg.LinAlgError:
             print('Error in eigh')
             print(X)
-            raise(Exception)
+            raise
 
         return Y
 
@@ -212,10 +249,8 @@ class npsdConeApprox():
                 # print('Warning in lobpcg, using exact projection')
                 # print(X)
                 converged = False
-            except:
-                # print('Error in lobpcg')
-                # print(X)
-                raise(Exception)
+            except np.linalg.LinAlgError:
+                # lobpcg failed, use the exact projection
                 converged = False
             
 
@@ -237,13 +272,17 @@ class nlinearSubdiff():
         self.A = A
         self.shape = A.shape
         self.counter = 0
+        self._tmp = np.empty(self.shape) # scratch for t*A
 
-    def prox(self, X, t=1):
+    def prox(self, X, t=1, out=None):
         """
         Compute the proximal operator of the linear subdifferential
+
+        If out is given the result is written into it, otherwise a new array is returned
         """
         self.counter += 1
-        Y = X - t*self.A
+        np.multiply(self.A, t, out=self._tmp)
+        Y = np.subtract(X, self._tmp, out=out)
         if self.counter % 1000 == 0:
             print('Value', self.counter, -np.trace(self.A @ Y))
         return Y
@@ -1,7 +1,6 @@
-from scipy.sparse.linalg import norm #, eigsh
 from scipy.sparse import csr_array
-from numpy import diag
-from numpy.linalg import eigh
+from numpy import maximum, eye
+from numpy.linalg import eigh, LinAlgError
 
 def trace(A, X):
     """
@@ -27,7 +26,7 @@ class traceEqualityIndicator():
         """
         Scale the matrix A by the squared Frobenius norm
         """    
-        return A/(norm(A, 'fro')**2)
+        return A/trace(A, A)
 
     def prox(self, X, t=1):
         """
@@ -53,7 +52,7 @@ class traceHalfspaceIndicator():
         """
         Scale the matrix A by the squared Frobenius norm
         """    
-        return A/(norm(A, 'fro')**2)
+        return A/trace(A, A)
 
     def prox(self, X, t=1):
         """
@@ -77,17 +76,16 @@ class psdCone():
         """
         Compute the proximal operator of the PSD cone
         """
+        X = X.toarray()
         try:
-            # print('X', X)
-            eig, vec = eigh(X.toarray())
-            eig[eig < 0] = 0
-        except:
-            print('Error in eigh')
-            print(X)
-
-        # Use scipy sparse matrix multiplication
-        #eig_sparse = csr_array(diag(eig))
-        return csr_array(vec @ diag(eig) @ vec.T)
+            eig, vec = eigh(X)
+        except LinAlgError:
+            # eigh can fail to converge on badly conditioned input, a tiny diagonal shift fixes it
+            eig, vec = eigh(X + 1e-12*eye(X.shape[0]))
+        maximum(eig, 0, out=eig)
+
+        # Scale the eigenvector columns instead of forming diag(eig)
+        return csr_array((vec * eig) @ vec.T)
 
 class linearSubdiff():
     """
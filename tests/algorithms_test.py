@@ -0,0 +1,186 @@
+import os
+import multiprocessing as mp
+import numpy as np
+from unittest.mock import patch
+from scipy.sparse import csr_array
+from oars.algorithms.serial import serialAlgorithm
+from oars.algorithms.parallel import parallelAlgorithm, SharedArena
+from oars.matrices import getMT, getFull
+from oars.algorithms import serial
+from oars.utils.proxs import quadprox, psdCone, traceEqualityIndicator, traceHalfspaceIndicator
+
+def getData(n, m=3):
+    return np.arange(n*m, dtype=float).reshape(n, m)**2/(n*m)
+
+# Verify the parallel iterates match the serial iterates when there are more nodes than cores
+def test_parallel_matches_serial(n=5, itrs=50):
+    print("Testing parallel against serial")
+    # Pretend there are only two cores, so the nodes are grouped into threads
+    with patch.object(os, 'sched_getaffinity', lambda pid: {0, 1}, create=True):
+        _parallel_matches_serial(n, itrs)
+
+def _parallel_matches_serial(n, itrs):
+    data = getData(n)
+    for getter in (getMT, getFull):
+        Z, W = getter(n)
+        xs, rs = serialAlgorithm(n, data, [quadprox]*n, W, Z, itrs=itrs, gamma=0.8)
+        xp, rp = parallelAlgorithm(n, data, [quadprox]*n, W, Z, itrs=itrs, gamma=0.8)
+        assert(np.allclose(xs, xp))
+        for i in range(n):
+            assert(np.allclose(rs[i]['x'], rp[i]['x']))
+            assert(np.allclose(rs[i]['v'], rp[i]['v']))
+
+# Verify both algorithms converge to the mean with and without vartol
+def test_vartol(n=5):
+    print("Testing vartol")
+    data = getData(n)
+    Z, W = getMT(n)
+    for vartol in (None, 1e-6):
+        xs, _ = serialAlgorithm(n, data, [quadprox]*n, W, Z, itrs=1000, vartol=vartol, gamma=1.0)
+        xp, _ = parallelAlgorithm(n, data, [quadprox]*n, W, Z, itrs=1000, vartol=vartol, gamma=1.0)
+        assert(np.allclose(xs, data.mean(axis=0), atol=1e-4))
+        assert(np.allclose(xp, data.mean(axis=0), atol=1e-4))
+
+# Verify the iterates and the values passed between nodes use the requested dtype
+def test_float32(n=4):
+    print("Testing float32")
+    data = getData(n)
+    Z, W = getFull(n)
+    xs, rs = serialAlgorithm(n, data, [quadprox]*n, W, Z, itrs=200, gamma=1.0, dtype=np.float32)
+    xp, rp = parallelAlgorithm(n, data, [quadprox]*n, W, Z, itrs=200, gamma=1.0, dtype=np.float32)
+    assert(xs.dtype == np.float32)
+    assert(xp.dtype == np.float32)
+    assert(rp[0]['v'].dtype == np.float32)
+    assert(np.allclose(xs, data.mean(axis=0), atol=1e-4))
+    assert(np.allclose(xp, data.mean(axis=0), atol=1e-4))
+
+# Verify the warm start primal for dense and sparse W and Z
+def test_warmstartprimal(n=4, itrs=20):
+    print("Testing warmstartprimal")
+    data = getData(n)
+    Z, W = getFull(n)
+    x0 = np.ones(data.shape[1])
+    xs, rs = serialAlgorithm(n, data, [quadprox]*n, W, Z, itrs=itrs, warmstartprimal=x0)
+    xss, rss = serialAlgorithm(n, data, [quadprox]*n, csr_array(W), csr_array(Z), itrs=itrs, warmstartprimal=x0)
+    xp, rp = parallelAlgorithm(n, data, [quadprox]*n, W, Z, itrs=itrs, warmstartprimal=x0)
+    assert(np.allclose(xs, xss))
+    assert(np.allclose(xs, xp))
+    for i in range(n):
+        assert(np.allclose(rs[i]['v'], rp[i]['v']))
+
+# Verify sparse W and Z give the same iterates as dense W and Z
+def test_sparse(n=6, itrs=50):
+    print("Testing sparse W and Z")
+    data = getData(n)
+    Z, W = getMT(n)
+    xd, rd = serialAlgorithm(n, data, [quadprox]*n, W, Z, itrs=itrs)
+    xs, rs = serialAlgorithm(n, data, [quadprox]*n, csr_array(W), csr_array(Z), itrs=itrs)
+    xp, rp = parallelAlgorithm(n, data, [quadprox]*n, csr_array(W), csr_array(Z), itrs=itrs)
+    assert(np.allclose(xd, xs))
+    assert(np.allclose(xd, xp))
+    for i in range(n):
+        assert(np.allclose(rd[i]['x'], rp[i]['x']))
+
+# Verify a dense design with a process per node stays within the default open file limit
+def test_dense_many_cores(n=24, itrs=20):
+    print("Testing a dense design on many cores")
+    try:
+        import resource
+    except ImportError: # resource is only available on POSIX
+        return
+    data = getData(n)
+    Z, W = getFull(n)
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(1024, hard), hard))
+    try:
+        with patch.object(os, 'sched_getaffinity', lambda pid: set(range(n)), create=True):
+            xp, rp = parallelAlgorithm(n, data, [quadprox]*n, W, Z, itrs=itrs, gamma=0.8)
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+    xs, rs = serialAlgorithm(n, data, [quadprox]*n, W, Z, itrs=itrs, gamma=0.8)
+    assert(np.allclose(xs, xp))
+
+# Verify resolvents writing into the iterates through out match resolvents returning new arrays
+def test_serial_out(d=6, itrs=200):
+    print("Testing serial resolvents with out")
+    rng = np.random.default_rng(1)
+    C = rng.standard_normal((d, d))
+    data = [(d, d), {'A': np.eye(d), 'v': 1.0}, C + C.T]
+    resolvents = [psdCone, traceEqualityIndicator, traceHalfspaceIndicator]
+    Z, W = getMT(3)
+    x, _ = serialAlgorithm(3, data, list(resolvents), W, Z, itrs=itrs, gamma=0.5, alpha=0.5)
+    with patch.object(serial, '_acceptsOut', lambda resolvent: False):
+        x_ref, _ = serialAlgorithm(3, data, list(resolvents), W, Z, itrs=itrs, gamma=0.5, alpha=0.5)
+    assert(np.allclose(x, x_ref))
+
+def putValues(q, values):
+    for value in values:
+        q.put(value)
+
+# Verify SharedArrayQueue returns values in order around the ring, within and across processes
+def test_shared_array_queue():
+    print("Testing SharedArrayQueue")
+    values = [np.full((2, 3), k, dtype=float) for k in range(7)]
+    arena = SharedArena([(0, 1)], (2, 3), slots=3)
+    q = arena.queues[0, 1]
+    try:
+        # Values come back in order while wrapping around the ring
+        for k in range(0, 6, 2):
+            q.put(values[k])
+            q.put(values[k+1])
+            assert(np.array_equal(q.get(), values[k]))
+            q.release()
+            assert(np.array_equal(q.get(), values[k+1]))
+            q.release()
+
+        # get returns a view of the slot, which is only reused after release
+        q.put(values[6])
+        msg = q.get()
+        assert(np.may_share_memory(msg, q.buf))
+        assert(np.array_equal(msg, values[6]))
+        q.release()
+    finally:
+        arena.close()
+
+    # The writers block on a full ring until the reader releases a slot, and the
+    # notices from both writers share the receiving node's pipe
+    arena = SharedArena([(0, 2), (1, 2)], (2, 3), slots=2)
+    try:
+        writers = [mp.Process(target=putValues, args=(arena.queues[i, 2], values)) for i in range(2)]
+        for writer in writers:
+            writer.start()
+        for value in values:
+            for i in (1, 0):
+                q = arena.queues[i, 2]
+                assert(np.array_equal(q.get(), value))
+                q.release()
+        for writer in writers:
+            writer.join()
+            assert(writer.exitcode == 0)
+    finally:
+        arena.close()
+
+# Verify get raises EOFError rather than returning a stale slot once the writers are gone
+def test_shared_array_queue_eof():
+    print("Testing SharedArrayQueue EOF")
+    arena = SharedArena([(0, 1)], (3,))
+    try:
+        arena.notices[1].writer.close()
+        try:
+            arena.queues[0, 1].get()
+            assert(False)
+        except EOFError:
+            pass
+    finally:
+        arena.close()
+
+if __name__ == '__main__':
+    test_parallel_matches_serial()
+    test_vartol()
+    test_float32()
+    test_warmstartprimal()
+    test_sparse()
+    test_serial_out()
+    test_dense_many_cores()
+    test_shared_array_queue()
+    test_shared_array_queue_eof()
@@ -264,4 +264,20 @@ def test_dual_redsmoothstrong(n, alpha=1):
     assert(np.allclose(tau_opt, pepit_tau))
     assert(tau_opt <= tau)
 
-test_dual_redsmoothstrong(4, alpha=1)
\ No newline at end of file
+test_dual_redsmoothstrong(4, alpha=1)
+
+# Verify the full and reduced formulations agree for Douglas-Rachford
+def test_tau_douglas_rachford(alpha=1, gamma=0.5):
+    print("Testing full against reduced tau for Douglas-Rachford")
+    L = np.array([[0, 0], [2, 0]])
+    W = np.array([[1, -1], [-1, 1]])
+    M = getIncidence(W)
+    ls = [2, 1000]
+    mus = [1, 0]
+    pepit_tau = wc_frugal_resolvent_splitting(L, W, ls, mus, alpha=alpha, gamma=gamma, verbose=-1)
+    pepit_tau_red = wc_reduced_frugal_resolvent_splitting(L, M, ls, mus, alpha=alpha, gamma=gamma, verbose=-1)
+    # print(pepit_tau, pepit_tau_red)
+    assert(np.isclose(pepit_tau, pepit_tau_red, rtol=1e-6))
+    assert(np.isclose(pepit_tau, 0.694167, atol=1e-6))
+
+test_tau_douglas_rachford()
@@ -0,0 +1,35 @@
+from oars.utils.proxs import psdCone
+from oars.utils.proxs_nolog import npsdCone
+import numpy as np
+
+def getSymmetric(n, npos, rng):
+    # Symmetric matrix with exactly npos positive eigenvalues, all well away from 0
+    Q, _ = np.linalg.qr(rng.standard_normal((n, n)))
+    d = np.concatenate([rng.uniform(1, 2, npos), -rng.uniform(1, 2, n - npos)])
+    return (Q * d) @ Q.T
+
+def projectReference(X):
+    eig, vec = np.linalg.eigh(X)
+    return (vec * np.maximum(eig, 0)) @ vec.T
+
+# Verify the PSD projections against a full eigh over alternating ranks
+# The rank at each call picks the branch for the next call, so this sequence
+# runs the full, positive only and negative only (X - V diag(eig) V^T) paths
+def test_psd_projection(n=20):
+    print("Testing PSD cone projections")
+    rng = np.random.default_rng(0)
+    ranks = [10, 2, 18, 19, 1, 1, 20, 0, 0, 17, 3]
+    for cone in (psdCone(n), npsdCone(n)):
+        out = np.empty((n, n))
+        for k, npos in enumerate(ranks):
+            X = getSymmetric(n, npos, rng)
+            ref = projectReference(X)
+            if k % 2:
+                Y = cone.prox(X, out=out)
+                assert(Y is out)
+            else:
+                Y = cone.prox(X)
+            assert(np.allclose(Y, ref, atol=1e-12))
+            assert(cone.npos == npos)
+
+test_psd_projection()